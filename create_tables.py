@@ -3,6 +3,25 @@ import psycopg2
 import sql_queries 
 from sql_queries import execute_query_list
 
+def create_tables(cur, conn):
+    """Drops and creates the staging and DWH tables
+
+    Args:
+        cur (psycopg2 cursor): Cursor to the database
+        conn (psycopg2 connection): Connection to the database
+    """
+    #Create Raw Staging Tables
+    # Comment this line if COPY from S3 to Redshift is not needed
+    # sql_queries.execute_commit_query_list(cur, conn, sql_queries.drop_raw_staging_table_queries)
+    execute_query_list(cur, conn, [*sql_queries.drop_raw_staging_table_queries, *sql_queries.create_raw_staging_table_queries])
+
+    #Create Intermediate Staging Tables
+    execute_query_list(cur, conn, [*sql_queries.drop_intermediate_staging_table_queries, *sql_queries.create_intermediate_staging_table_queries])
+
+    #Create Data Warehouse Tables
+    execute_query_list(cur, conn, [*sql_queries.drop_dwh_table_queries, *sql_queries.create_dwh_table_queries])
+
+
 def main():
     """Entry point for DDL scripts
     """    
@@ -12,16 +31,7 @@ def main():
     conn = psycopg2.connect(f"host={config.get('CLUSTER','HOST')} dbname={config.get('CLUSTER','DB_NAME')} user={config.get('CLUSTER','DB_USER')} password={config.get('CLUSTER','DB_PASSWORD')} port={config.get('CLUSTER','DB_PORT')}")
     cur = conn.cursor()
     try:
-        #Create Raw Staging Tables
-        # Comment this line if COPY from S3 to Redshift is not needed
-        # sql_queries.execute_commit_query_list(cur, conn, sql_queries.drop_raw_staging_table_queries)
-        execute_query_list(cur, conn, [*sql_queries.drop_raw_staging_table_queries, *sql_queries.create_raw_staging_table_queries])
-
-        #Create Intermediate Staging Tables
-        execute_query_list(cur, conn, [*sql_queries.drop_intermediate_staging_table_queries, *sql_queries.create_intermediate_staging_table_queries])
-
-        #Create Data Warehouse Tables
-        execute_query_list(cur, conn, [*sql_queries.drop_dwh_table_queries, *sql_queries.create_dwh_table_queries])
+        create_tables(cur, conn)
     finally:
         conn.close()
 
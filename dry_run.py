@@ -0,0 +1,156 @@
+import hashlib
+import json
+import math
+import posixpath
+from collections import defaultdict
+
+
+def split_s3_uri(uri):
+    """Splits an S3 URI into bucket and key prefix
+
+    Args:
+        uri (string): S3 URI, e.g. s3://udacity-dend/song-data/A/A
+
+    Returns:
+        tuple of strings: bucket, key prefix
+    """
+    bucket, _, prefix = uri.replace("s3://", "", 1).partition("/")
+    return bucket, prefix
+
+
+def list_source_files(s3, uri):
+    """Lists the json files under an S3 prefix
+
+    Args:
+        s3 (boto3 s3 client): Client to the S3 API
+        uri (string): S3 URI of the source prefix
+
+    Returns:
+        list of tuples: key and size in bytes of each file
+    """
+    bucket, prefix = split_s3_uri(uri)
+    files = []
+    for page in s3.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix):
+        files.extend((obj['Key'], obj['Size']) for obj in page.get('Contents', []) if obj['Key'].endswith(".json"))
+    return files
+
+
+def stratified_sample(files, fraction):
+    """Picks a deterministic fraction of the files of each directory,
+    so the sample keeps the same mix of partitions (song-data/A/B/C, log-data/2018/11) as the full input
+
+    Args:
+        files (list of tuples): key and size in bytes of each file
+        fraction (float): Fraction of the files to keep, between 0 and 1
+
+    Returns:
+        list of tuples: key and size in bytes of the sampled files
+    """
+    strata = defaultdict(list)
+    for key, size in files:
+        strata[posixpath.dirname(key)].append((key, size))
+    sample = []
+    for stratum_files in strata.values():
+        # Ordered by key hash, so the same files are picked on every run
+        stratum_files.sort(key=lambda file: hashlib.md5(file[0].encode("utf-8")).hexdigest())
+        sample.extend(stratum_files[:max(1, math.ceil(fraction * len(stratum_files)))])
+    return sorted(sample)
+
+
+def write_manifest(s3, bucket, files, manifest_uri):
+    """Writes to S3 the COPY manifest of the sampled files
+
+    Args:
+        s3 (boto3 s3 client): Client to the S3 API
+        bucket (string): Bucket of the sampled files
+        files (list of tuples): key and size in bytes of the sampled files
+        manifest_uri (string): S3 URI of the manifest
+    """
+    manifest_bucket, manifest_key = split_s3_uri(manifest_uri)
+    entries = [{"url": f"s3://{bucket}/{key}", "mandatory": True} for key, _ in files]
+    s3.put_object(Bucket=manifest_bucket, Key=manifest_key, Body=json.dumps({"entries": entries}).encode("utf-8"))
+
+
+def linear_fit(small_input, small_value, large_input, large_value):
+    """Fits value = fixed + per_byte * input through both sampled runs.
+    Both costs are kept non negative, so a larger input never predicts a smaller value
+
+    Args:
+        small_input (int): Input bytes of the smaller sampled run
+        small_value (float): Value (seconds, rows) of the smaller sampled run
+        large_input (int): Input bytes of the larger sampled run
+        large_value (float): Value of the larger sampled run
+
+    Returns:
+        tuple of floats: fixed cost, cost per input byte
+    """
+    if large_input <= 0:
+        return large_value, 0.0
+    if large_input <= small_input:
+        return 0.0, large_value / large_input
+    per_byte = max(0.0, (large_value - small_value) / (large_input - small_input))
+    fixed = large_value - per_byte * large_input
+    if fixed < 0:
+        # Grows faster than linear between the samples, extrapolate it proportionally
+        return 0.0, large_value / large_input
+    return fixed, per_byte
+
+
+def extrapolate(small_input, small_value, large_input, large_value, full_input):
+    """Extrapolates a value of the sampled runs to the full input with the fixed plus per byte cost fit
+
+    Args:
+        small_input (int): Input bytes of the smaller sampled run
+        small_value (float): Value of the smaller sampled run
+        large_input (int): Input bytes of the larger sampled run
+        large_value (float): Value of the larger sampled run
+        full_input (int): Input bytes of the full run
+
+    Returns:
+        tuple of floats: extrapolated value, fixed cost, cost per input byte
+    """
+    fixed, per_byte = linear_fit(small_input, small_value, large_input, large_value)
+    return max(large_value, fixed + per_byte * full_input), fixed, per_byte
+
+
+def print_extrapolation(title, unit, small_input, small_values, large_input, large_values, full_input):
+    """Prints the extrapolation to the full input of every measured value
+
+    Args:
+        title (string): Report title, e.g. Stage duration
+        unit (string): Unit of the values
+        small_input (int): Input bytes of the smaller sampled run
+        small_values (dict): Values by stage / table of the smaller sampled run
+        large_input (int): Input bytes of the larger sampled run
+        large_values (dict): Values by stage / table of the larger sampled run
+        full_input (int): Input bytes of the full run
+
+    Returns:
+        dict: Extrapolated value by stage / table
+    """
+    print(f"{title} extrapolated to the full input ({full_input} bytes):")
+    extrapolated = {}
+    for name, large_value in large_values.items():
+        value, fixed, per_byte = extrapolate(small_input, small_values.get(name, 0), large_input, large_value, full_input)
+        extrapolated[name] = value
+        print(f"    {name}: {large_value:.1f} {unit} sampled, {value:.1f} {unit} full ({fixed:.1f} {unit} fixed + {per_byte * 1024 * 1024:.3f} {unit} per input MB)")
+    print(f"    total: {sum(extrapolated.values()):.1f} {unit}")
+    return extrapolated
+
+
+def print_size_extrapolation(sampled_sizes, full_rows, row_bytes):
+    """Prints the table sizes of the full run, as extrapolated rows times the measured bytes per row.
+    The sampled svv_table_info size is only a floor, it counts 1 MB blocks with a per column, per slice minimum
+
+    Args:
+        sampled_sizes (dict): MB by table of the larger sampled run
+        full_rows (dict): Extrapolated rows by table
+        row_bytes (dict): Average uncompressed bytes per row by table
+    """
+    print("Table size extrapolated to the full input (uncompressed estimate):")
+    total = 0
+    for name, rows in full_rows.items():
+        size = max(sampled_sizes.get(name, 0), rows * row_bytes.get(name, 0) / (1024 * 1024))
+        total += size
+        print(f"    {name}: {rows:.0f} rows x {row_bytes.get(name, 0):.0f} bytes, {size:.1f} MB")
+    print(f"    total: {total:.1f} MB")
@@ -1,29 +1,211 @@
+import argparse
 import configparser
+import time
+from functools import partial
+import boto3
 import psycopg2
+import dry_run
 import sql_queries
-from sql_queries import execute_query_list
+from create_tables import create_tables
+from sql_queries import execute_stage, stage_concurrency, stage_session
+from table_maintenance import maintain_tables
 
 
-def main():
+def connect(config, section='CLUSTER'):
+    """Opens a connection to the cluster database
+
+    Args:
+        config (configparser): dwh.cfg configuration
+        section (string): Section with the connection params, [SAMPLING] for the sampled dry run
+
+    Returns:
+        psycopg2 connection: Connection to the database
+    """
+    return psycopg2.connect(f"host={config.get(section,'HOST')} dbname={config.get(section,'DB_NAME')} user={config.get(section,'DB_USER')} password={config.get(section,'DB_PASSWORD')} port={config.get(section,'DB_PORT')}")
+
+
+def check_sampling_target(config):
+    """Makes sure the sampled dry run, which drops and recreates every table, does not target the [CLUSTER] database
+
+    Args:
+        config (configparser): dwh.cfg configuration
+
+    Raises:
+        ValueError: When the [SAMPLING] database is not set or is the [CLUSTER] database,
+            or S3_PREFIX is not an s3:// URI
+    """
+    target = tuple(config.get('SAMPLING', option).strip().lower() for option in ['HOST', 'DB_NAME', 'DB_PORT'])
+    if not all(target):
+        raise ValueError("Set the [SAMPLING] HOST, DB_NAME and DB_PORT of a scratch database for the sampled dry run")
+    if target == tuple(config.get('CLUSTER', option).strip().lower() for option in ['HOST', 'DB_NAME', 'DB_PORT']):
+        raise ValueError("The [SAMPLING] database is the [CLUSTER] database, the sampled dry run drops and recreates every table")
+    s3_prefix = config.get('SAMPLING', 'S3_PREFIX')
+    if not s3_prefix.startswith("s3://"):
+        raise ValueError(f"[SAMPLING] S3_PREFIX must be the s3:// URI the sample manifests are written to, got '{s3_prefix}'")
+
+
+def report_match_rate(cur, conn, stage):
+    """Prints how many stream events link to a song title and artist name by normalized match key
+
+    Args:
+        cur (psycopg2 cursor): Cursor to the database
+        conn (psycopg2 connection): Connection to the database
+        stage (string): Pipeline stage, set as query_group label of the query
+    """
+    with stage_session(cur, conn, stage):
+        cur.execute(sql_queries.match_rate_select)
+        event_count, song_match_count, artist_match_count = cur.fetchone()
+    if event_count:
+        print(f"Song match rate: {song_match_count}/{event_count} ({song_match_count / event_count:.2%})")
+        print(f"Artist match rate: {artist_match_count}/{event_count} ({artist_match_count / event_count:.2%})")
+
+
+def run_pipeline(cur, conn, config, copy_table_queries=sql_queries.copy_table_queries, section='CLUSTER'):
+    """Runs every ETL stage, timing each of them
+
+    Args:
+        cur (psycopg2 cursor): Cursor to the database
+        conn (psycopg2 connection): Connection to the database
+        config (configparser): dwh.cfg configuration
+        copy_table_queries (list of strings): COPY statements of the raw staging tables
+        section (string): Section with the connection params of the stage connections
+
+    Returns:
+        dict: Seconds taken by each stage
+    """
+    # Every stage runs labeled with its query_group and within its [WLM] limits
+    stage_connect = partial(connect, config, section)
+    wlm = config['WLM']
+    # Fail before loading anything when a sequential stage is set to run concurrently
+    for stage in sql_queries.sequential_stage_names:
+        stage_concurrency(stage, wlm)
+    timings = {}
+
+    def timed(stage, run, *args):
+        start = time.time()
+        run(*args)
+        timings[stage] = time.time() - start
+        print(f"{stage} took {timings[stage]:.1f}s")
+
+    # Load Raw Staging Tables
+    timed('etl_staging_copy', execute_stage, cur, conn, stage_connect, copy_table_queries, 'etl_staging_copy', wlm)
+
+    # Calculate Normalized Match Keys
+    timed('etl_match_keys', execute_stage, cur, conn, stage_connect, sql_queries.update_match_key_queries, 'etl_match_keys', wlm)
+    report_match_rate(cur, conn, 'etl_match_keys')
+
+    # Load Intermediate Staging Tables
+    timed('etl_artist_cascade', execute_stage, cur, conn, stage_connect, sql_queries.insert_intermediate_staging_table_queries, 'etl_artist_cascade', wlm)
+
+    # Load DWH Tables
+    timed('etl_dwh_insert', execute_stage, cur, conn, stage_connect, sql_queries.insert_dwh_table_queries, 'etl_dwh_insert', wlm)
+
+    # Build Sessions, extending the open ones
+    timed('etl_sessions', execute_stage, cur, conn, stage_connect, sql_queries.insert_session_table_queries, 'etl_sessions', wlm)
+
+    # VACUUM / ANALYZE the DWH Tables that crossed the thresholds
+    timed('etl_maintenance', maintain_tables, cur, conn, config['MAINTENANCE'], 'etl_maintenance')
+    return timings
+
+
+def sampled_run(cur, conn, config, s3, source_files, fraction):
+    """Recreates the tables and runs every stage over a stratified sample of the source files
+
+    Args:
+        cur (psycopg2 cursor): Cursor to the database
+        conn (psycopg2 connection): Connection to the database
+        config (configparser): dwh.cfg configuration
+        s3 (boto3 s3 client): Client to the S3 API
+        source_files (dict): key and size of the files of LOG_DATA and SONG_DATA
+        fraction (float): Fraction of the source files to load
+
+    Returns:
+        tuple: sampled input bytes, seconds by stage, rows by table, MB by table, bytes per row by table
+    """
+    print(f"Sampled run with {fraction:.2%} of the source files")
+    manifest_prefix = config.get('SAMPLING', 'S3_PREFIX').rstrip('/')
+    copy_table_queries = []
+    input_bytes = 0
+    for option, copy_query in [('LOG_DATA', sql_queries.staging_events_copy_query), ('SONG_DATA', sql_queries.staging_songs_copy_query)]:
+        sample = dry_run.stratified_sample(source_files[option], fraction)
+        input_bytes += sum(size for _, size in sample)
+        manifest_uri = f"{manifest_prefix}/{option.lower()}_{fraction}.manifest"
+        dry_run.write_manifest(s3, dry_run.split_s3_uri(config.get('S3', option))[0], sample, manifest_uri)
+        copy_table_queries.append(copy_query(manifest_uri, "manifest"))
+
+    create_tables(cur, conn)
+    timings = run_pipeline(cur, conn, config, copy_table_queries, 'SAMPLING')
+
+    cur.execute(sql_queries.table_size_select, (tuple(sql_queries.sampled_table_names),))
+    table_sizes = cur.fetchall()
+    rows = {table: float(tbl_rows) for table, _, tbl_rows in table_sizes}
+    sizes = {table: float(size) for table, size, _ in table_sizes}
+    row_bytes = {}
+    for table in rows:
+        cur.execute(sql_queries.table_columns_select, (table,))
+        columns = cur.fetchall()
+        cur.execute(sql_queries.row_bytes_select(table, columns))
+        row_bytes[table] = float(cur.fetchone()[0])
+    conn.commit()
+    return input_bytes, timings, rows, sizes, row_bytes
+
+
+def sample_main(cur, conn, config):
+    """Dry run over two deterministic samples, FRACTION / 2 and FRACTION of the source files,
+    extrapolating stage durations and table rows to the full input with a fixed plus per byte cost fit between them,
+    and table sizes as the extrapolated rows times the measured bytes per row.
+    A FRACTION / 4 warm up run goes first, so the measured runs do not pay the query compilation.
+    The tables are dropped and recreated for each sample, on the [SAMPLING] scratch database
+
+    Args:
+        cur (psycopg2 cursor): Cursor to the database
+        conn (psycopg2 connection): Connection to the database
+        config (configparser): dwh.cfg configuration
+    """
+    aws_config = configparser.ConfigParser()
+    aws_config.read('aws.cfg')
+    s3 = boto3.client('s3',
+        region_name=config.get('S3', 'BUCKET_REGION'),
+        aws_access_key_id=aws_config.get('AWS', 'KEY'),
+        aws_secret_access_key=aws_config.get('AWS', 'SECRET'))
+
+    source_files = {option: dry_run.list_source_files(s3, config.get('S3', option)) for option in ['LOG_DATA', 'SONG_DATA']}
+    full_input = sum(size for files in source_files.values() for _, size in files)
+    fraction = config.getfloat('SAMPLING', 'FRACTION')
+
+    # Warm up, then always the smaller sample before the larger one
+    sampled_run(cur, conn, config, s3, source_files, fraction / 4)
+    small_input, small_timings, small_rows, _, _ = sampled_run(cur, conn, config, s3, source_files, fraction / 2)
+    large_input, large_timings, large_rows, large_sizes, row_bytes = sampled_run(cur, conn, config, s3, source_files, fraction)
+
+    dry_run.print_extrapolation("Stage duration", "s", small_input, small_timings, large_input, large_timings, full_input)
+    full_rows = dry_run.print_extrapolation("Table rows", "rows", small_input, small_rows, large_input, large_rows, full_input)
+    dry_run.print_size_extrapolation(large_sizes, full_rows, row_bytes)
+
+
+def main(sample=False):
     """Entry point for DML scripts to load data into the database
+
+    Args:
+        sample (bool): Dry run over a sample of the source files, extrapolating the full run
     """    
     config = configparser.ConfigParser()
     config.read('dwh.cfg')
 
-    conn = psycopg2.connect(f"host={config.get('CLUSTER','HOST')} dbname={config.get('CLUSTER','DB_NAME')} user={config.get('CLUSTER','DB_USER')} password={config.get('CLUSTER','DB_PASSWORD')} port={config.get('CLUSTER','DB_PORT')}")
+    if sample:
+        check_sampling_target(config)
+    conn = connect(config, 'SAMPLING' if sample else 'CLUSTER')
     cur = conn.cursor()
     try:
-        # Load Raw Staging Tables
-        execute_query_list(cur, conn, sql_queries.copy_table_queries)
-
-        # Load Intermediate Staging Tables
-        execute_query_list(cur, conn, sql_queries.insert_intermediate_staging_table_queries)
-
-        # Load DWH Tables
-        execute_query_list(cur, conn, sql_queries.insert_dwh_table_queries)
+        if sample:
+            sample_main(cur, conn, config)
+        else:
+            run_pipeline(cur, conn, config)
     finally:    
         conn.close()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sample', action='store_true', help="dry run over a sample of the source files, extrapolating the full run")
+    main(parser.parse_args().sample)
\ No newline at end of file
@@ -0,0 +1,181 @@
+import configparser
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import psycopg2
+import sql_queries
+from sql_queries import execute_query_list
+from validate_staging import column_widths, decoded_lines, list_files, parse_record, quarantine_record, read_jsonpaths, rendered_text
+
+# Rows are flushed to COPY FROM STDIN once the buffer reaches this size
+BUFFER_SIZE = 8 * 1024 * 1024
+
+# COPY text format escapes
+TEXT_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def copy_text_row(values):
+    """Renders the column values as a COPY text format row
+
+    Args:
+        values (list): Column values, None for NULL
+
+    Returns:
+        string: Tab delimited row, ending with a new line
+    """
+    return "\t".join("\\N" if value is None else rendered_text(value).translate(TEXT_ESCAPES) for value in values) + "\n"
+
+
+def flush(cur, buffer, copy_query):
+    """Sends the buffered rows with COPY FROM STDIN and empties the buffer to reuse it
+
+    Args:
+        cur (psycopg2 cursor): Cursor to the database
+        buffer (io.StringIO): Buffered rows
+        copy_query (string): COPY ... FROM STDIN statement
+    """
+    if buffer.tell() == 0:
+        return
+    buffer.seek(0)
+    cur.copy_expert(copy_query, buffer)
+    buffer.seek(0)
+    buffer.truncate()
+
+
+def load_files(conn, relative_paths, source_dir, quarantine_dir, copy_query, columns, widths, key_paths=None):
+    """Streams the files through the column mapping into the staging table, on its own connection and buffer.
+    Records the Redshift COPY would reject (invalid UTF-8, malformed json, too long values) are skipped
+    and written, with their reason, to quarantine_dir.
+    Does not commit, load_source commits once every worker succeeded
+
+    Args:
+        conn (psycopg2 connection): Connection of the worker
+        relative_paths (list of strings): File paths relative to source_dir
+        source_dir (string): Local source directory
+        quarantine_dir (string): Directory for the skipped records
+        copy_query (string): COPY ... FROM STDIN statement
+        columns (list of strings): Columns loaded by COPY
+        widths (list of ints): Width in bytes of each column, with the Redshift rules (see column_widths)
+        key_paths (list of tuples of strings): JSONPaths mapping, json 'auto ignorecase' when None
+
+    Returns:
+        tuple of ints: loaded row count, skipped record count
+    """
+    cur = conn.cursor()
+    buffer = io.StringIO()
+    row_count = 0
+    skipped_count = 0
+    for relative_path in relative_paths:
+        quarantine_file = None
+        try:
+            for line_number, raw_line, line in decoded_lines(os.path.join(source_dir, relative_path)):
+                if not raw_line.strip():
+                    continue
+                values, reason = (None, "invalid utf-8") if line is None else parse_record(line, columns, widths, key_paths)
+                if values is None:
+                    quarantine_file = quarantine_record(quarantine_file, os.path.join(quarantine_dir, relative_path), line_number, raw_line, reason)
+                    skipped_count += 1
+                    continue
+                buffer.write(copy_text_row(values))
+                row_count += 1
+                if buffer.tell() >= BUFFER_SIZE:
+                    flush(cur, buffer, copy_query)
+        finally:
+            if quarantine_file is not None:
+                quarantine_file.close()
+    flush(cur, buffer, copy_query)
+    return row_count, skipped_count
+
+
+def load_source(connect, name, source_dir, quarantine_dir, workers, copy_query, truncate_query, columns, widths, key_paths=None):
+    """Loads every file of a source spreading them across a thread pool, one connection per thread.
+    The workers commit only when all of them succeeded. As they commit one after another,
+    the staging table is truncated when one of the commits fails, so a failed load leaves no rows behind
+
+    Args:
+        connect (function): Opens a new connection to the database
+        name (string): Source name, e.g. log-data
+        source_dir (string): Local source directory
+        quarantine_dir (string): Directory for the skipped records
+        workers (int): Thread pool size
+        copy_query (string): COPY ... FROM STDIN statement
+        truncate_query (string): TRUNCATE statement of the staging table
+        columns (list of strings): Columns loaded by COPY
+        widths (list of ints): Width in bytes of each column, with the Redshift rules (see column_widths)
+        key_paths (list of tuples of strings): JSONPaths mapping, json 'auto ignorecase' when None
+
+    Returns:
+        int: Loaded row count
+    """
+    relative_paths = list(list_files(source_dir))
+    partitions = [relative_paths[i::workers] for i in range(workers) if relative_paths[i::workers]]
+    start = time.time()
+    connections = []
+    try:
+        for _ in partitions:
+            connections.append(connect())
+        load = partial(load_files, source_dir=source_dir, quarantine_dir=os.path.join(quarantine_dir, name),
+            copy_query=copy_query, columns=columns, widths=widths, key_paths=key_paths)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            counts = list(executor.map(load, connections, partitions))
+        try:
+            for conn in connections:
+                conn.commit()
+        except Exception:
+            # Clears the rows of the workers that committed before the failing one
+            truncate_conn = connect()
+            try:
+                execute_query_list(truncate_conn.cursor(), truncate_conn, [truncate_query])
+            finally:
+                truncate_conn.close()
+            raise
+    finally:
+        # Closing without commit rolls back the uncommitted workers
+        for conn in connections:
+            conn.close()
+    elapsed = time.time() - start
+    row_count = sum(rows for rows, _ in counts)
+    skipped_count = sum(skipped for _, skipped in counts)
+    print(f"{name}: {row_count} rows from {len(relative_paths)} files in {elapsed:.1f}s ({row_count / elapsed if elapsed else 0:.0f} rows/sec), {skipped_count} invalid records quarantined")
+    return row_count
+
+
+def main():
+    """Entry point for loading the raw staging tables of a Postgres compatible target from the local files.
+    The raw staging tables are recreated first with their DDL, which is portable,
+    as create_tables.py also runs the Redshift only DWH DDL (diststyle, sortkey).
+    The loaded rows mirror a Redshift COPY: the varchar widths are checked in UTF-8 bytes
+    and a plain varchar is limited to 256, even though Postgres counts characters and does not limit it
+    """
+    config = configparser.ConfigParser()
+    config.read('dwh.cfg')
+    postgres = config['POSTGRES']
+    validation = config['VALIDATION']
+    workers = postgres.getint('WORKERS')
+
+    connect = partial(psycopg2.connect, f"host={postgres.get('HOST')} dbname={postgres.get('DB_NAME')} user={postgres.get('DB_USER')} password={postgres.get('DB_PASSWORD')} port={postgres.get('DB_PORT')}")
+
+    conn = connect()
+    try:
+        execute_query_list(conn.cursor(), conn, [*sql_queries.drop_raw_staging_table_queries, *sql_queries.create_raw_staging_table_queries])
+    finally:
+        conn.close()
+
+    load_source(connect, 'log-data', validation['LOG_DATA_DIR'], postgres['QUARANTINE_DIR'], workers,
+        sql_queries.staging_events_copy_stdin,
+        sql_queries.staging_events_truncate,
+        sql_queries.staging_events_copy_columns,
+        column_widths(sql_queries.staging_events_table_create, sql_queries.staging_events_copy_columns),
+        read_jsonpaths(validation['LOG_JSONPATH_FILE']))
+
+    load_source(connect, 'song-data', validation['SONG_DATA_DIR'], postgres['QUARANTINE_DIR'], workers,
+        sql_queries.staging_songs_copy_stdin,
+        sql_queries.staging_songs_truncate,
+        sql_queries.staging_songs_copy_columns,
+        column_widths(sql_queries.staging_songs_table_create, sql_queries.staging_songs_copy_columns))
+
+
+if __name__ == "__main__":
+    main()
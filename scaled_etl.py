@@ -0,0 +1,139 @@
+import configparser
+import time
+import traceback
+import boto3
+import etl
+
+
+def cluster_props(redshift, cluster_identifier):
+    """Describes the Redshift cluster
+
+    Args:
+        redshift (boto3 redshift client): Client to the Redshift API
+        cluster_identifier (string): Cluster identifier
+
+    Returns:
+        dict: Cluster properties
+    """
+    return redshift.describe_clusters(ClusterIdentifier=cluster_identifier)['Clusters'][0]
+
+
+def wait_until_available(redshift, cluster_identifier, num_nodes=None, poll_seconds=30, timeout_seconds=3600, sleep=time.sleep):
+    """Polls the cluster until it is available, and has num_nodes nodes when given.
+    Right after a resize / resume request the cluster may still report its previous state
+
+    Args:
+        redshift (boto3 redshift client): Client to the Redshift API
+        cluster_identifier (string): Cluster identifier
+        num_nodes (int): Number of nodes to wait for, any when None
+        poll_seconds (int): Seconds between polls
+        timeout_seconds (int): Seconds to wait before giving up
+        sleep (function): Sleep function, replaceable for testing
+
+    Returns:
+        dict: Cluster properties once available
+
+    Raises:
+        TimeoutError: When the cluster is not available after timeout_seconds
+    """
+    waited = 0
+    while True:
+        props = cluster_props(redshift, cluster_identifier)
+        if props['ClusterStatus'] == 'available' and num_nodes in (None, props['NumberOfNodes']):
+            return props
+        if waited >= timeout_seconds:
+            raise TimeoutError(f"Cluster {cluster_identifier} still {props['ClusterStatus']} with {props['NumberOfNodes']} nodes after {waited} seconds")
+        print(f"Cluster {cluster_identifier} is {props['ClusterStatus']} with {props['NumberOfNodes']} nodes, waiting")
+        sleep(poll_seconds)
+        waited += poll_seconds
+
+
+def resume_if_paused(redshift, cluster_identifier, **wait_args):
+    """Resumes the cluster if it is paused and waits until it is available
+
+    Args:
+        redshift (boto3 redshift client): Client to the Redshift API
+        cluster_identifier (string): Cluster identifier
+        wait_args: Arguments for wait_until_available
+
+    Returns:
+        dict: Cluster properties once available
+    """
+    if cluster_props(redshift, cluster_identifier)['ClusterStatus'] == 'paused':
+        print(f"Resuming cluster {cluster_identifier}")
+        redshift.resume_cluster(ClusterIdentifier=cluster_identifier)
+    return wait_until_available(redshift, cluster_identifier, **wait_args)
+
+
+def resize(redshift, cluster_identifier, num_nodes, **wait_args):
+    """Elastic resizes the cluster to num_nodes, if it has a different size, and waits until it is available
+
+    Args:
+        redshift (boto3 redshift client): Client to the Redshift API
+        cluster_identifier (string): Cluster identifier
+        num_nodes (int): Target number of nodes
+        wait_args: Arguments for wait_until_available
+
+    Returns:
+        dict: Cluster properties once available
+    """
+    props = wait_until_available(redshift, cluster_identifier, **wait_args)
+    if props['NumberOfNodes'] == num_nodes:
+        return props
+    print(f"Resizing cluster {cluster_identifier} from {props['NumberOfNodes']} to {num_nodes} nodes")
+    redshift.resize_cluster(ClusterIdentifier=cluster_identifier, NumberOfNodes=num_nodes, Classic=False)
+    return wait_until_available(redshift, cluster_identifier, num_nodes, **wait_args)
+
+
+def run_in_load_window(redshift, cluster_identifier, num_nodes, load_num_nodes, pause_after_load, pipeline, **wait_args):
+    """Resumes and resizes up the cluster, runs the pipeline, then resizes down and optionally pauses the cluster
+
+    Args:
+        redshift (boto3 redshift client): Client to the Redshift API
+        cluster_identifier (string): Cluster identifier
+        num_nodes (int): Number of nodes outside the load window
+        load_num_nodes (int): Number of nodes during the load window
+        pause_after_load (bool): Pause the cluster once the load window is over
+        pipeline (function): ETL to run within the load window
+        wait_args: Arguments for wait_until_available
+    """
+    resume_if_paused(redshift, cluster_identifier, **wait_args)
+    try:
+        # Within the try, so the cluster is resized down and paused even when the scale up wait fails
+        resize(redshift, cluster_identifier, load_num_nodes, **wait_args)
+        pipeline()
+    except Exception:
+        # Printed before resizing down, so a failing resize / pause does not hide it
+        print("Load window failed, resizing down the cluster")
+        traceback.print_exc()
+        raise
+    finally:
+        resize(redshift, cluster_identifier, num_nodes, **wait_args)
+        if pause_after_load:
+            print(f"Pausing cluster {cluster_identifier}")
+            redshift.pause_cluster(ClusterIdentifier=cluster_identifier)
+
+
+def main():
+    """Entry point for the ETL within a load window with a larger cluster
+    """
+    aws_config = configparser.ConfigParser()
+    aws_config.read('aws.cfg')
+    config = configparser.ConfigParser()
+    config.read('dwh.cfg')
+
+    redshift = boto3.client('redshift',
+        region_name=aws_config.get('AWS', 'CLUSTER_REGION'),
+        aws_access_key_id=aws_config.get('AWS', 'KEY'),
+        aws_secret_access_key=aws_config.get('AWS', 'SECRET'))
+
+    run_in_load_window(redshift,
+        config.get('CLUSTER', 'CLUSTER_IDENTIFIER'),
+        config.getint('CLUSTER', 'NUM_NODES'),
+        config.getint('CLUSTER', 'LOAD_NUM_NODES'),
+        config.getboolean('CLUSTER', 'PAUSE_AFTER_LOAD'),
+        etl.main)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,137 @@
 import configparser
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
-def execute_query_list(cur, conn, queries):
+# WORKLOAD MANAGEMENT
+# The stage label is set as query_group so WLM can route the ETL statements to its own queue
+query_group_set = "set query_group to '{stage}';"
+query_group_reset = "reset query_group;"
+wlm_query_slot_count_set = "set wlm_query_slot_count to {slot_count};"
+wlm_query_slot_count_reset = "reset wlm_query_slot_count;"
+
+# Stages whose statements depend on the previous ones, they cannot run concurrently
+sequential_stage_names = ["etl_artist_cascade", "etl_sessions"]
+
+@contextmanager
+def stage_session(cur, conn, stage=None, slot_count=None):
+    """Labels the session with the stage query_group and wlm_query_slot_count,
+    resetting both on the way out even when a statement fails
+
+    Args:
+        cur (psycopg2 cursor): Cursor to the database
+        conn (psycopg2 connection): Connection to the database
+        stage (string): Pipeline stage, set as query_group label of the statements
+        slot_count (int): wlm_query_slot_count for the statements, more memory for the queue slot
+    """
+    if stage:
+        cur.execute(query_group_set.format(stage=stage))
+    if slot_count:
+        cur.execute(wlm_query_slot_count_set.format(slot_count=slot_count))
+    try:
+        yield
+    except Exception:
+        # The failed transaction must be rolled back before the session can be reset
+        conn.rollback()
+        raise
+    finally:
+        if not conn.closed:
+            if slot_count:
+                cur.execute(wlm_query_slot_count_reset)
+            if stage:
+                cur.execute(query_group_reset)
+            conn.commit()
+
+
+def execute_query_list(cur, conn, queries, stage=None, slot_count=None):
     """Executes in a transaction the query list
 
     Args:
         cur (psycopg2 cursor): Cursor to the database
         conn (psycopg2 connection): Connection to the database
         queries (list of strings): SQL queries 
+        stage (string): Pipeline stage, set as query_group label of the queries
+        slot_count (int): wlm_query_slot_count for the queries, more memory for the queue slot
+    """
+    with stage_session(cur, conn, stage, slot_count):
+        for query in queries:
+            cur.execute(query)
+            conn.commit()
+
+
+def stage_concurrency(stage, wlm):
+    """Reads the <STAGE>_CONCURRENCY limit of a stage
+
+    Args:
+        stage (string): Pipeline stage, e.g. etl_artist_cascade
+        wlm (configparser section): [WLM] section with the stage limits
+
+    Returns:
+        int: How many statements of the stage run at once
+
+    Raises:
+        ValueError: When a sequential stage is set to run concurrently, its dependent steps would run out of order
+    """
+    concurrency = wlm.getint(f'{stage}_CONCURRENCY', fallback=1)
+    if concurrency > 1 and stage in sequential_stage_names:
+        raise ValueError(f"{stage} statements depend on each other, {stage.upper()}_CONCURRENCY must be 1, got {concurrency}")
+    return concurrency
+
+
+def execute_stage(cur, conn, connect, queries, stage, wlm):
+    """Executes the query list of a pipeline stage with the [WLM] limits of the stage:
+    <STAGE>_CONCURRENCY statements at once, each with <STAGE>_SLOT_COUNT slots.
+    With a concurrency above 1 the queries must not depend on each other,
+    they are spread across that many connections
+
+    Args:
+        cur (psycopg2 cursor): Cursor to the database
+        conn (psycopg2 connection): Connection to the database
+        connect (function): Opens a new connection to the database
+        queries (list of strings): SQL queries 
+        stage (string): Pipeline stage, e.g. etl_artist_cascade
+        wlm (configparser section): [WLM] section with the stage limits
     """
-    for query in queries:
-        cur.execute(query)
-        conn.commit()
+    concurrency = stage_concurrency(stage, wlm)
+    slot_count = wlm.getint(f'{stage}_SLOT_COUNT', fallback=1)
+    if concurrency <= 1:
+        execute_query_list(cur, conn, queries, stage, slot_count)
+        return
+
+    def execute_on_own_connection(stage_queries):
+        stage_conn = connect()
+        try:
+            execute_query_list(stage_conn.cursor(), stage_conn, stage_queries, stage, slot_count)
+        finally:
+            stage_conn.close()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # list() so the first failing statement raises here
+        list(executor.map(execute_on_own_connection, [queries[i::concurrency] for i in range(concurrency) if queries[i::concurrency]]))
+
+
+def canonical_form(column):
+    """SQL expression with the canonical form of a name used for matching:
+    lower case, without punctuation and with single spaces
+
+    Args:
+        column (string): SQL expression holding the raw name
+
+    Returns:
+        string: SQL expression with the canonical name
+    """
+    return f"trim(regexp_replace(regexp_replace(lower({column}), '[[:punct:]]', ''), '[[:space:]]+', ' '))"
+
+
+def match_key(*columns):
+    """SQL expression with a fixed width (char(32)) hash key over the canonical form of the columns
+
+    Args:
+        columns (strings): SQL expressions holding the raw names, e.g. artist name and song title
+
+    Returns:
+        string: SQL expression with the md5 hash key
+    """
+    return "md5(" + " || '|' || ".join(canonical_form(column) for column in columns) + ")"
 
 
 # CONFIG
@@ -19,12 +140,13 @@ config.read('dwh.cfg')
 
 # DROP TABLES RAW STAGING TABLES
 staging_events_table_drop = "DROP TABLE IF EXISTS staging_events;"
-staging_songs_table_drop = "DROP TABLE IF EXISTS staging_events;"
+staging_songs_table_drop = "DROP TABLE IF EXISTS staging_songs;"
 
 # DROP TABLES INTERMEDIATE STAGING TABLES
 staging_artist_row_table_drop = "DROP TABLE IF EXISTS staging_artist_row;"
 staging_artist_id_name_table_drop = "DROP TABLE IF EXISTS staging_artist_id_name;"
 staging_artist_names_table_drop = "DROP TABLE IF EXISTS staging_artist_names;"
+staging_sessions_table_drop = "DROP TABLE IF EXISTS staging_sessions;"
 
 # DROP TABLES DWH TABLES
 
@@ -33,6 +155,7 @@ song_titles_table_drop = "drop table if exists song_titles;"
 user_table_drop = "drop table if exists users;"
 time_table_drop = "drop table if exists time;"
 songplay_table_drop = "drop table if exists songplays;"
+session_table_drop = "drop table if exists sessions;"
 
 # ********************************************************************
 # ************************ RAW STAGING TABLES ************************
@@ -46,6 +169,7 @@ songplay_table_drop = "drop table if exists songplays;"
 # there is character content larger at staging_events.artist 
 # than the default varchar default length (256)
 # Will have string fields only to have the raw data captured in from the source. 
+# artist_key and song_key are not loaded from the source, they are the normalized match keys
 staging_events_table_create= ("""
 CREATE TABLE if not exists staging_events 
 (
@@ -66,7 +190,9 @@ CREATE TABLE if not exists staging_events
   status varchar,
   ts varchar,
   userAgent varchar,
-  userId varchar
+  userId varchar,
+  artist_key char(32),
+  song_key char(32)
 );
 """)
 
@@ -74,6 +200,7 @@ CREATE TABLE if not exists staging_events
 # there is character content larger at staging_songs.title, staging_songs.artist_name and staging_songs.artist_location
 # than the default varchar default length (256)
 # Will have string fields only to have the raw data captured in from the source. 
+# artist_key and song_key are not loaded from the source, they are the normalized match keys
 staging_songs_table_create = ("""
 CREATE TABLE if not exists staging_songs 
 (
@@ -86,7 +213,9 @@ CREATE TABLE if not exists staging_songs
   duration varchar,
   artist_id varchar,
   artist_longitude varchar,
-  artist_location  varchar(1000)
+  artist_location  varchar(1000),
+  artist_key char(32),
+  song_key char(32)
 );
 """)
 
@@ -137,6 +266,24 @@ CREATE TABLE staging_artist_names
 );
 """)
 
+# Working table with the sessions found in the latest load
+# Only carries the events that are not yet counted at the sessions fact table
+staging_sessions_table_create = ("""
+CREATE TABLE staging_sessions 
+(   
+  user_id int,
+  session_id int,
+  start_time timestamp without time zone,
+  start_time_key int,
+  end_time timestamp without time zone,
+  end_time_key int,
+  last_item_in_session int,
+  song_count int,
+  total_length decimal(19,4),
+  level varchar
+);
+""")
+
 # ***********************************************************
 # ************************ DW TABLES ************************
 # ***********************************************************
@@ -153,6 +300,7 @@ create table if not exists artist_names
 (
     name varchar(1000) not null primary key sortkey,
     artist_id varchar not null,        
+    artist_key char(32) not null,
     latitude decimal(10,8) null,
     longitude  decimal(11,8) null,
     location varchar(1000) null
@@ -169,6 +317,8 @@ create table if not exists song_titles
     title varchar(1000) not null,    
     year int not null,
     duration decimal(19,4) not null,
+    artist_key char(32) not null,
+    song_key char(32) not null,
     primary key (artist_name, title)    
 ) 
 diststyle KEY
@@ -220,26 +370,154 @@ create table if not exists songplays
     session_id int  not null,
     location varchar(1000) not null,
     user_agent varchar not null,
-    stream_duration decimal(19,4) 
+    stream_duration decimal(19,4),
+    artist_key char(32) not null,
+    song_key char(32) not null
 ) diststyle KEY;
 """)
 
+# Sessions fact table, one record per user session
+# Distributed by user, so extending a session only touches its own slice
+# Having as sort key the session start time key to link to the time dimension
+# last_item_in_session is the itemInSession watermark already counted for the session
+sessions_table_create = ("""
+create table if not exists sessions
+(
+    user_id int not null,
+    session_id int not null,
+    start_time timestamp without time zone not null,
+    start_time_key int not null sortkey,
+    end_time timestamp without time zone not null,
+    end_time_key int not null,
+    last_item_in_session int not null,
+    song_count int not null,
+    total_length decimal(19,4) not null,
+    level varchar not null,
+    primary key (user_id, session_id)
+) 
+diststyle KEY
+distkey (user_id)
+;
+""")
+
 # LOADING STAGING TABLES
 
-staging_events_copy = (f"""
-copy staging_events 
-from '{config['S3']['LOG_DATA']}' 
+# Column lists leave the match keys out, they are calculated after the load
+# staging_events columns are in the same order as the LOG_JSONPATH expressions
+staging_events_copy_columns = [
+    "artist", "auth", "firstName", "gender", "itemInSession", "lastName", "length", "level", "location",
+    "method", "page", "registration", "sessionId", "song", "status", "ts", "userAgent", "userId"]
+staging_songs_copy_columns = [
+    "song_id", "num_songs", "title", "artist_name", "artist_latitude", "year", "duration",
+    "artist_id", "artist_longitude", "artist_location"]
+
+# When a manifest from the pre-COPY validator (validate_staging.py) is configured
+# COPY loads only the clean files it lists
+def copy_source(data_option, manifest_option):
+    """FROM clause and manifest option of a staging COPY
+
+    Args:
+        data_option (string): [S3] option with the source data prefix
+        manifest_option (string): [S3] option with the clean files manifest, may be empty
+
+    Returns:
+        tuple of strings: source URI and manifest option
+    """
+    manifest = config['S3'].get(manifest_option)
+    if manifest:
+        return manifest, "manifest"
+    return config['S3'][data_option], ""
+
+def staging_events_copy_query(source, manifest=""):
+    """COPY statement of staging_events
+
+    Args:
+        source (string): S3 URI of the log data prefix or manifest
+        manifest (string): "manifest" when source is a manifest
+
+    Returns:
+        string: SQL COPY statement
+    """
+    return (f"""
+copy staging_events ({", ".join(staging_events_copy_columns)})
+from '{source}' 
 iam_role '{config['IAM_ROLE']['ARN']}'
 region '{config['S3']['BUCKET_REGION']}'
-json '{config['S3']['LOG_JSONPATH']}';
+json '{config['S3']['LOG_JSONPATH']}'
+{manifest};
 """)
 
-staging_songs_copy = (f"""
-copy staging_songs 
-from '{config['S3']['SONG_DATA']}' 
+def staging_songs_copy_query(source, manifest=""):
+    """COPY statement of staging_songs
+
+    Args:
+        source (string): S3 URI of the song data prefix or manifest
+        manifest (string): "manifest" when source is a manifest
+
+    Returns:
+        string: SQL COPY statement
+    """
+    return (f"""
+copy staging_songs ({", ".join(staging_songs_copy_columns)})
+from '{source}' 
 iam_role '{config['IAM_ROLE']['ARN']}'
 region '{config['S3']['BUCKET_REGION']}'
-json 'auto ignorecase';
+json 'auto ignorecase'
+{manifest};
+""")
+
+staging_events_copy = staging_events_copy_query(*copy_source('LOG_DATA', 'LOG_MANIFEST'))
+staging_songs_copy = staging_songs_copy_query(*copy_source('SONG_DATA', 'SONG_MANIFEST'))
+
+# Postgres compatible targets have no COPY from S3,
+# postgres_loader.py streams the local files in text format through STDIN
+staging_events_copy_stdin = f"copy staging_events ({', '.join(staging_events_copy_columns)}) from stdin;"
+staging_songs_copy_stdin = f"copy staging_songs ({', '.join(staging_songs_copy_columns)}) from stdin;"
+
+# Clear a partially committed COPY FROM STDIN load
+staging_events_truncate = "truncate staging_events;"
+staging_songs_truncate = "truncate staging_songs;"
+
+# NORMALIZED MATCH KEYS
+# Hash keys over the canonical artist name and (artist name, song title)
+# so events link to song titles and artist names with a fixed width equi-join
+# COPY appends to the staging tables, only the newly copied rows (without keys) are updated,
+# as an UPDATE rewrites the rows
+staging_events_match_key_update = (f"""
+update staging_events
+set artist_key = {match_key('artist')},
+    song_key = {match_key('artist', 'song')}
+where page = 'NextSong'
+and artist_key is null;
+""")
+
+staging_songs_match_key_update = (f"""
+update staging_songs
+set artist_key = {match_key('artist_name')},
+    song_key = {match_key('artist_name', 'title')}
+where artist_key is null;
+""")
+
+# How many stream events find their song title and artist name by match key
+match_rate_select = ("""
+with event_keys as (
+    select artist_key, song_key
+    from staging_events
+    where page = 'NextSong'
+),
+song_keys as (
+    select distinct song_key from staging_songs
+),
+artist_keys as (
+    select distinct artist_key from staging_songs
+)
+select 
+    count(1) as event_count,
+    count(sk.song_key) as song_match_count,
+    count(ak.artist_key) as artist_match_count
+from event_keys e
+left join song_keys sk on e.song_key = sk.song_key
+left join artist_keys ak on e.artist_key = ak.artist_key;
 """)
 
 # LOADING INTERMEDIATE STAGING TABLES
@@ -574,10 +852,11 @@ from staging_artist_names_5 an5;
 # FINAL DWH TABLES
 
 # Load Artist names dimension based on the last step of the staging table
-artist_table_insert = ("""
+artist_table_insert = (f"""
 insert into artist_names (
     name,
     artist_id,
+    artist_key,
     latitude,  
     longitude,
     location
@@ -585,6 +864,7 @@ insert into artist_names (
 select distinct
 an.artist_name,
 an.recalculated_artist_id,
+{match_key('an.artist_name')},
 an.artist_latitude,
 an.artist_longitude,    
 an.artist_location    
@@ -596,14 +876,16 @@ where step = 6;
 # keep 1 record per artist_name and title 
 song_titles_table_insert = ("""
 insert into song_titles
-(artist_name, title, year, duration)
+(artist_name, title, year, duration, artist_key, song_key)
 select     
     s.artist_name,
     s.title,    
     max(s.year)::int as year,
-    max(s.duration)::decimal(19,4) as duration
+    max(s.duration)::decimal(19,4) as duration,
+    s.artist_key,
+    s.song_key
 from staging_songs s
-group by s.artist_name, s.title;
+group by s.artist_name, s.title, s.artist_key, s.song_key;
 """)
 
 # Load users table dimension
@@ -679,7 +961,9 @@ insert into songplays (
     session_id,
     location,
     user_agent,
-    stream_duration 
+    stream_duration,
+    artist_key,
+    song_key
 )
 with stream_relevant_records as (
     select TIMESTAMP 'epoch' + (ts/1000) * INTERVAL '1 Second ' as start_time,    
@@ -698,7 +982,9 @@ with stream_relevant_records as (
     sessionId::int,
     location,
     userAgent,
-    length
+    length,
+    artist_key,
+    song_key
     from staging_events 
     where page = 'NextSong'
 )
@@ -712,10 +998,199 @@ select
     e.sessionid as session_id,
     e.location,
     e.userAgent as user_agent,
-    e.length as stream_duration
+    e.length as stream_duration,
+    e.artist_key,
+    e.song_key
 from stream_relevant_records e
 """)
 
+# SESSIONS
+
+# Clear the working table from the previous run
+staging_sessions_truncate = ("""
+truncate staging_sessions;
+""")
+
+# Aggregate per user session the stream events that are newer 
+# than the itemInSession watermark stored at the sessions fact table
+staging_sessions_insert = ("""
+insert into staging_sessions (
+    user_id,
+    session_id,
+    start_time,
+    start_time_key,
+    end_time,
+    end_time_key,
+    last_item_in_session,
+    song_count,
+    total_length,
+    level
+)
+with session_events as (
+    select TIMESTAMP 'epoch' + (e.ts/1000) * INTERVAL '1 Second ' as event_time,
+    extract(year from event_time) * 1000000
+    + extract(month from event_time) * 10000
+    + extract(day from event_time) * 100
+    + extract(hour from event_time) as event_time_key,
+    e.userId::int as user_id,
+    e.sessionId::int as session_id,
+    e.itemInSession::int as item_in_session,
+    e.length::decimal(19,4) as length,
+    e.level
+    from staging_events e
+    where e.page = 'NextSong'
+),
+new_session_events as (
+    select se.*
+    from session_events se
+    left join sessions s on 
+        se.user_id = s.user_id 
+        and se.session_id = s.session_id
+    where s.last_item_in_session is null
+    or se.item_in_session > s.last_item_in_session
+)
+select distinct
+    user_id,
+    session_id,
+    first_value(event_time) over (
+        partition by user_id, session_id order by item_in_session
+        rows between unbounded preceding and unbounded following
+    ) as start_time,
+    first_value(event_time_key) over (
+        partition by user_id, session_id order by item_in_session
+        rows between unbounded preceding and unbounded following
+    ) as start_time_key,
+    last_value(event_time) over (
+        partition by user_id, session_id order by item_in_session
+        rows between unbounded preceding and unbounded following
+    ) as end_time,
+    last_value(event_time_key) over (
+        partition by user_id, session_id order by item_in_session
+        rows between unbounded preceding and unbounded following
+    ) as end_time_key,
+    max(item_in_session) over (partition by user_id, session_id) as last_item_in_session,
+    count(1) over (partition by user_id, session_id) as song_count,
+    coalesce(sum(length) over (partition by user_id, session_id), 0) as total_length,
+    last_value(level) over (
+        partition by user_id, session_id order by item_in_session
+        rows between unbounded preceding and unbounded following
+    ) as level
+from new_session_events;
+""")
+
+# Extend the open sessions with the newly arrived events
+session_table_update = ("""
+update sessions
+set end_time = ss.end_time,
+    end_time_key = ss.end_time_key,
+    last_item_in_session = ss.last_item_in_session,
+    song_count = sessions.song_count + ss.song_count,
+    total_length = sessions.total_length + ss.total_length,
+    level = ss.level
+from staging_sessions ss
+where sessions.user_id = ss.user_id
+and sessions.session_id = ss.session_id;
+""")
+
+# Load the sessions that are not at the fact table yet
+session_table_insert = ("""
+insert into sessions (
+    user_id,
+    session_id,
+    start_time,
+    start_time_key,
+    end_time,
+    end_time_key,
+    last_item_in_session,
+    song_count,
+    total_length,
+    level
+)
+select 
+    ss.user_id,
+    ss.session_id,
+    ss.start_time,
+    ss.start_time_key,
+    ss.end_time,
+    ss.end_time_key,
+    ss.last_item_in_session,
+    ss.song_count,
+    ss.total_length,
+    ss.level
+from staging_sessions ss
+where not exists (
+    select 1 from sessions s 
+    where s.user_id = ss.user_id 
+    and s.session_id = ss.session_id
+);
+""")
+
+# MAINTENANCE
+
+# Unsorted, stats off and deleted rows percentages of the DWH tables
+# deleted rows are the ones not yet reclaimed, estimated_visible_rows excludes them
+table_maintenance_select = ("""
+select 
+    "table",
+    coalesce(unsorted, 0) as unsorted_pct,
+    coalesce(stats_off, 0) as stats_off_pct,
+    case when tbl_rows > 0 
+        then (tbl_rows - estimated_visible_rows) * 100.0 / tbl_rows 
+        else 0 
+    end as deleted_pct
+from svv_table_info
+where "table" in %s;
+""")
+
+# Size in 1 MB blocks and rows of the tables, to extrapolate a sampled run
+table_size_select = ("""
+select 
+    "table",
+    size,
+    tbl_rows
+from svv_table_info
+where "table" in %s;
+""")
+
+# Columns of a table, to measure its average row width
+table_columns_select = ("""
+select "column", type
+from pg_table_def
+where tablename = %s;
+""")
+
+def column_text(column, column_type):
+    """Text of a column for its length, booleans cannot be cast to varchar on Redshift
+
+    Args:
+        column (string): Column name
+        column_type (string): Column type, as in pg_table_def
+
+    Returns:
+        string: SQL expression
+    """
+    if column_type == "boolean":
+        return f"case when \"{column}\" then 'true' when not \"{column}\" then 'false' end"
+    return f"\"{column}\"::varchar"
+
+def row_bytes_select(table, columns):
+    """Average uncompressed bytes per row of a table, as the text length of its columns
+
+    Args:
+        table (string): Table name
+        columns (list of tuples of strings): Name and type of each column
+
+    Returns:
+        string: SQL query
+    """
+    row_bytes = " + ".join(f"coalesce(octet_length({column_text(column, column_type)}), 0)" for column, column_type in columns)
+    # avg of an integer expression is truncated to an integer
+    return f"select coalesce(avg(({row_bytes})::float8), 0) from {table};"
+
+vacuum_sort_only = "vacuum sort only {table};"
+vacuum_delete_only = "vacuum delete only {table};"
+analyze_predicate_columns = "analyze {table} predicate columns;"
+
 # QUERY LISTS
 
 create_raw_staging_table_queries = [
@@ -726,14 +1201,16 @@ create_intermediate_staging_table_queries = [
     # INTERMEDIATE STAGING TABLES
     staging_artist_row_table_create,
     staging_artist_id_name_table_create,
-    staging_artist_names_table_create]
+    staging_artist_names_table_create,
+    staging_sessions_table_create]
     # DWH TABLES
 create_dwh_table_queries = [
     artist_names_table_create,
     song_titles_table_create,
     user_table_create,        
     time_table_create,
-    songplay_table_create
+    songplay_table_create,
+    sessions_table_create
     ]
 
 drop_raw_staging_table_queries = [
@@ -744,18 +1221,29 @@ drop_intermediate_staging_table_queries = [
     # INTERMEDIATE STAGING TABLES
     staging_artist_row_table_drop,
     staging_artist_id_name_table_drop,
-    staging_artist_names_table_drop]
+    staging_artist_names_table_drop,
+    staging_sessions_table_drop]
 drop_dwh_table_queries = [
     # DWH TABLES
     artist_names_table_drop, 
     song_titles_table_drop,    
     user_table_drop,    
     time_table_drop,
-    songplay_table_drop]
+    songplay_table_drop,
+    session_table_drop]
+
+# DWH TABLES checked by the maintenance stage
+dwh_table_names = ["artist_names", "song_titles", "users", "time", "songplays", "sessions"]
+
+# Tables measured by a sampled run
+sampled_table_names = ["staging_events", "staging_songs", *dwh_table_names]
 
 # RAW STAGING TABLES
 copy_table_queries = [staging_events_copy, staging_songs_copy]
 
+# Normalized match keys, right after the raw staging load
+update_match_key_queries = [staging_events_match_key_update, staging_songs_match_key_update]
+
 # Load first song and artist
 insert_intermediate_staging_table_queries = [
     # INTERMEDIATE STAGING TABLES
@@ -773,4 +1261,12 @@ insert_dwh_table_queries = [
     song_titles_table_insert,
     user_table_insert,
     time_table_insert,
-    songplay_table_insert]
\ No newline at end of file
+    songplay_table_insert]
+
+# Build sessions
+# Order matters, open sessions are extended before the new ones are inserted
+insert_session_table_queries = [
+    staging_sessions_truncate,
+    staging_sessions_insert,
+    session_table_update,
+    session_table_insert]
\ No newline at end of file
@@ -0,0 +1,76 @@
+import configparser
+import time
+import psycopg2
+import sql_queries
+from sql_queries import stage_session
+
+
+def maintenance_queries(table, unsorted_pct, stats_off_pct, deleted_pct, thresholds):
+    """Picks the VACUUM / ANALYZE statements a table needs, only where a threshold is crossed
+
+    Args:
+        table (string): Table name
+        unsorted_pct (float): Percentage of unsorted rows
+        stats_off_pct (float): Percentage of staleness of the table statistics
+        deleted_pct (float): Percentage of deleted rows not yet reclaimed
+        thresholds (configparser section): UNSORTED_PCT, STATS_OFF_PCT and DELETED_PCT thresholds
+
+    Returns:
+        list of strings: SQL maintenance statements
+    """
+    queries = []
+    if deleted_pct > thresholds.getfloat('DELETED_PCT'):
+        queries.append(sql_queries.vacuum_delete_only.format(table=table))
+    if unsorted_pct > thresholds.getfloat('UNSORTED_PCT'):
+        queries.append(sql_queries.vacuum_sort_only.format(table=table))
+    if stats_off_pct > thresholds.getfloat('STATS_OFF_PCT'):
+        queries.append(sql_queries.analyze_predicate_columns.format(table=table))
+    return queries
+
+
+def maintain_tables(cur, conn, thresholds, stage=None):
+    """Runs VACUUM / ANALYZE on the DWH tables that crossed the thresholds, printing how long each took.
+    VACUUM cannot run inside a transaction block, so the connection runs in autocommit meanwhile
+
+    Args:
+        cur (psycopg2 cursor): Cursor to the database
+        conn (psycopg2 connection): Connection to the database
+        thresholds (configparser section): UNSORTED_PCT, STATS_OFF_PCT and DELETED_PCT thresholds
+        stage (string): Pipeline stage, set as query_group label of the statements
+    """
+    with stage_session(cur, conn, stage):
+        cur.execute(sql_queries.table_maintenance_select, (tuple(sql_queries.dwh_table_names),))
+        table_stats = cur.fetchall()
+        conn.commit()
+
+        autocommit = conn.autocommit
+        conn.autocommit = True
+        try:
+            for table, unsorted_pct, stats_off_pct, deleted_pct in table_stats:
+                queries = maintenance_queries(table, float(unsorted_pct), float(stats_off_pct), float(deleted_pct), thresholds)
+                if not queries:
+                    print(f"{table}: unsorted {unsorted_pct:.2f}%, stats off {stats_off_pct:.2f}%, deleted {deleted_pct:.2f}%, no maintenance needed")
+                for query in queries:
+                    start = time.time()
+                    cur.execute(query)
+                    print(f"{table}: unsorted {unsorted_pct:.2f}%, stats off {stats_off_pct:.2f}%, deleted {deleted_pct:.2f}%, {query.strip()} took {time.time() - start:.1f}s")
+        finally:
+            conn.autocommit = autocommit
+
+
+def main():
+    """Entry point for the maintenance of the DWH tables
+    """
+    config = configparser.ConfigParser()
+    config.read('dwh.cfg')
+
+    conn = psycopg2.connect(f"host={config.get('CLUSTER','HOST')} dbname={config.get('CLUSTER','DB_NAME')} user={config.get('CLUSTER','DB_USER')} password={config.get('CLUSTER','DB_PASSWORD')} port={config.get('CLUSTER','DB_PORT')}")
+    cur = conn.cursor()
+    try:
+        maintain_tables(cur, conn, config['MAINTENANCE'])
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
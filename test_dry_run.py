@@ -0,0 +1,34 @@
+import dry_run
+
+
+def test_extrapolate_never_predicts_less_than_the_sample():
+    # The smaller sample paid the query compilation
+    value, fixed, per_byte = dry_run.extrapolate(100, 200, 200, 150, 10000)
+
+    assert value >= 150
+    assert fixed >= 0 and per_byte >= 0
+
+
+def test_extrapolate_fixed_plus_per_byte_cost():
+    value, fixed, per_byte = dry_run.extrapolate(1000, 20, 2000, 30, 100000)
+
+    assert (fixed, per_byte) == (10.0, 0.01)
+    assert value == 1010.0
+
+
+def test_size_is_extrapolated_rows_times_bytes_per_row(capsys):
+    # Both samples report the same block count, the svv_table_info minimum
+    dry_run.print_size_extrapolation({'songplays': 160.0}, {'songplays': 10 * 1024 * 1024}, {'songplays': 100.0})
+
+    assert "songplays: 10485760 rows x 100 bytes, 1000.0 MB" in capsys.readouterr().out
+
+
+def test_stratified_sample_is_deterministic_and_keeps_every_directory():
+    files = [(f"song-data/A/{directory}/TR{i}.json", 100) for directory in "ABC" for i in range(20)]
+
+    small = dry_run.stratified_sample(files, 0.1)
+    large = dry_run.stratified_sample(files, 0.2)
+
+    assert dry_run.stratified_sample(files, 0.1) == small
+    assert set(small) <= set(large)
+    assert {key.split("/")[2] for key, _ in small} == set("ABC")
@@ -0,0 +1,17 @@
+import configparser
+import pytest
+import etl
+
+
+def sampling_config(s3_prefix):
+    config = configparser.ConfigParser()
+    config.read_dict({
+        'CLUSTER': {'HOST': 'dwhcluster.example.com', 'DB_NAME': 'dwh', 'DB_PORT': '5439'},
+        'SAMPLING': {'HOST': 'dwhcluster.example.com', 'DB_NAME': 'dwh_sampling', 'DB_PORT': '5439', 'S3_PREFIX': s3_prefix}})
+    return config
+
+
+def test_check_sampling_target_requires_an_s3_prefix():
+    etl.check_sampling_target(sampling_config('s3://dwh-sampling/manifests'))
+    with pytest.raises(ValueError):
+        etl.check_sampling_target(sampling_config(''))
@@ -0,0 +1,64 @@
+import json
+import pytest
+import postgres_loader
+import sql_queries
+
+
+class FakeConnection:
+    """Connection and cursor recording the executed statements, optionally failing on commit"""
+    closed = 0
+
+    def __init__(self, statements, fail_commit=False):
+        self.statements = statements
+        self.fail_commit = fail_commit
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        self.statements.append(query)
+
+    def copy_expert(self, query, buffer):
+        self.statements.append(buffer.read())
+
+    def commit(self):
+        if self.fail_commit:
+            raise RuntimeError("commit failed")
+        self.statements.append("commit")
+
+    def rollback(self):
+        self.statements.append("rollback")
+
+    def close(self):
+        pass
+
+
+def write_source(source_dir):
+    source_dir.mkdir()
+    (source_dir / "a.json").write_text('{"artist_id": "AR1"}\n{"artist_id": "' + "x" * 300 + '"}\n')
+    (source_dir / "b.json").write_text('{"artist_id": "AR2"}\n')
+
+
+def test_load_source_truncates_the_staging_table_when_a_commit_fails(tmp_path):
+    write_source(tmp_path / "song-data")
+    statements = []
+    connections = iter([FakeConnection(statements), FakeConnection(statements, fail_commit=True), FakeConnection(statements)])
+
+    with pytest.raises(RuntimeError):
+        postgres_loader.load_source(lambda: next(connections), 'song-data', str(tmp_path / "song-data"), str(tmp_path / "quarantine"), 2,
+            sql_queries.staging_songs_copy_stdin, sql_queries.staging_songs_truncate, ['artist_id'], [256])
+
+    truncate_index = statements.index(sql_queries.staging_songs_truncate)
+    assert statements[truncate_index + 1] == "commit"
+
+
+def test_load_source_quarantines_the_skipped_records_with_their_reason(tmp_path):
+    write_source(tmp_path / "song-data")
+    statements = []
+
+    row_count = postgres_loader.load_source(lambda: FakeConnection(statements), 'song-data', str(tmp_path / "song-data"), str(tmp_path / "quarantine"), 2,
+        sql_queries.staging_songs_copy_stdin, sql_queries.staging_songs_truncate, ['artist_id'], [256])
+
+    assert row_count == 2
+    quarantined = [json.loads(line) for line in (tmp_path / "quarantine" / "song-data" / "a.json").read_text().splitlines()]
+    assert [(record["line"], record["reason"]) for record in quarantined] == [(2, "artist_id is 300 bytes, longer than varchar(256)")]
@@ -0,0 +1,97 @@
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+import scaled_etl
+
+CLUSTER_IDENTIFIER = 'dwhCluster'
+
+
+def redshift_client():
+    return boto3.client('redshift', region_name='us-west-2', aws_access_key_id='key', aws_secret_access_key='secret')
+
+
+def add_describe(stubber, status, num_nodes):
+    stubber.add_response('describe_clusters',
+        {'Clusters': [{'ClusterIdentifier': CLUSTER_IDENTIFIER, 'ClusterStatus': status, 'NumberOfNodes': num_nodes}]},
+        {'ClusterIdentifier': CLUSTER_IDENTIFIER})
+
+
+def add_resize(stubber, num_nodes):
+    stubber.add_response('resize_cluster',
+        {'Cluster': {'ClusterIdentifier': CLUSTER_IDENTIFIER}},
+        {'ClusterIdentifier': CLUSTER_IDENTIFIER, 'NumberOfNodes': num_nodes, 'Classic': False})
+
+
+def test_run_in_load_window_waits_for_the_resize_to_land():
+    redshift = redshift_client()
+    stubber = Stubber(redshift)
+    # Resume, the cluster still reports paused right after the request
+    add_describe(stubber, 'paused', 4)
+    stubber.add_response('resume_cluster', {'Cluster': {'ClusterIdentifier': CLUSTER_IDENTIFIER}}, {'ClusterIdentifier': CLUSTER_IDENTIFIER})
+    add_describe(stubber, 'paused', 4)
+    add_describe(stubber, 'available', 4)
+    # Resize up, the cluster still reports available with 4 nodes right after the request
+    add_describe(stubber, 'available', 4)
+    add_resize(stubber, 8)
+    add_describe(stubber, 'available', 4)
+    add_describe(stubber, 'resizing', 8)
+    add_describe(stubber, 'available', 8)
+    # Described by the pipeline
+    add_describe(stubber, 'available', 8)
+    # Resize down and pause
+    add_describe(stubber, 'available', 8)
+    add_resize(stubber, 4)
+    add_describe(stubber, 'available', 4)
+    stubber.add_response('pause_cluster', {'Cluster': {'ClusterIdentifier': CLUSTER_IDENTIFIER}}, {'ClusterIdentifier': CLUSTER_IDENTIFIER})
+
+    pipeline_props = []
+    with stubber:
+        scaled_etl.run_in_load_window(redshift, CLUSTER_IDENTIFIER, 4, 8, True,
+            lambda: pipeline_props.append(scaled_etl.cluster_props(redshift, CLUSTER_IDENTIFIER)),
+            sleep=lambda seconds: None)
+        stubber.assert_no_pending_responses()
+
+    assert pipeline_props[0]['ClusterStatus'] == 'available'
+    assert pipeline_props[0]['NumberOfNodes'] == 8
+
+
+def test_run_in_load_window_prints_the_pipeline_error_when_pause_fails(capsys):
+    redshift = redshift_client()
+    stubber = Stubber(redshift)
+    # Resume check and wait, resize up and resize down waits, already at 8 nodes
+    for _ in range(4):
+        add_describe(stubber, 'available', 8)
+    stubber.add_client_error('pause_cluster', 'InvalidClusterState')
+
+    def failing_pipeline():
+        raise RuntimeError("songplay insert failed")
+
+    with stubber, pytest.raises(ClientError):
+        scaled_etl.run_in_load_window(redshift, CLUSTER_IDENTIFIER, 8, 8, True, failing_pipeline, sleep=lambda seconds: None)
+
+    assert "songplay insert failed" in capsys.readouterr().err
+
+
+def test_run_in_load_window_resizes_down_and_pauses_when_the_scale_up_times_out():
+    redshift = redshift_client()
+    stubber = Stubber(redshift)
+    # Resume check and wait
+    add_describe(stubber, 'available', 4)
+    add_describe(stubber, 'available', 4)
+    # Resize up is accepted, but the cluster is still resizing when the wait times out
+    add_describe(stubber, 'available', 4)
+    add_resize(stubber, 8)
+    add_describe(stubber, 'resizing', 8)
+    # Resize down and pause
+    add_describe(stubber, 'available', 8)
+    add_resize(stubber, 4)
+    add_describe(stubber, 'available', 4)
+    stubber.add_response('pause_cluster', {'Cluster': {'ClusterIdentifier': CLUSTER_IDENTIFIER}}, {'ClusterIdentifier': CLUSTER_IDENTIFIER})
+
+    pipeline_runs = []
+    with stubber, pytest.raises(TimeoutError):
+        scaled_etl.run_in_load_window(redshift, CLUSTER_IDENTIFIER, 4, 8, True, lambda: pipeline_runs.append(1),
+            timeout_seconds=0, sleep=lambda seconds: None)
+    stubber.assert_no_pending_responses()
+    assert pipeline_runs == []
@@ -0,0 +1,50 @@
+import configparser
+import pytest
+import sql_queries
+
+
+class FakeConnection:
+    """Connection and cursor recording the executed statements"""
+    closed = 0
+
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        self.statements.append(query)
+        if query == "failing query":
+            raise RuntimeError("failing query")
+
+    def commit(self):
+        self.statements.append("commit")
+
+    def rollback(self):
+        self.statements.append("rollback")
+
+
+def test_execute_query_list_resets_the_session_when_a_query_fails():
+    conn = FakeConnection()
+    with pytest.raises(RuntimeError):
+        sql_queries.execute_query_list(conn, conn, ["failing query"], "etl_dwh_insert", 2)
+
+    assert conn.statements[-4:] == ["rollback", sql_queries.wlm_query_slot_count_reset, sql_queries.query_group_reset, "commit"]
+
+
+def test_sequential_stages_cannot_run_concurrently():
+    config = configparser.ConfigParser()
+    config.read_dict({'WLM': {'ETL_ARTIST_CASCADE_CONCURRENCY': '2', 'ETL_DWH_INSERT_CONCURRENCY': '2'}})
+
+    assert sql_queries.stage_concurrency('etl_dwh_insert', config['WLM']) == 2
+    with pytest.raises(ValueError):
+        sql_queries.stage_concurrency('etl_artist_cascade', config['WLM'])
+
+
+def test_row_bytes_select_renders_booleans_without_a_varchar_cast():
+    query = sql_queries.row_bytes_select('time', [('start_time', 'timestamp without time zone'), ('is_weekend', 'boolean')])
+
+    assert "\"is_weekend\"::varchar" not in query
+    assert "case when \"is_weekend\" then 'true' when not \"is_weekend\" then 'false' end" in query
+    assert "::float8)" in query
@@ -0,0 +1,311 @@
+import configparser
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import sql_queries
+
+# Redshift varchar default length
+DEFAULT_VARCHAR_LENGTH = 256
+
+
+def column_widths(create_statement, columns):
+    """Reads the varchar / char width of the columns from the staging table DDL, with the Redshift rules:
+    the width is in UTF-8 bytes and a plain varchar is varchar(256)
+
+    Args:
+        create_statement (string): CREATE TABLE statement of the staging table
+        columns (list of strings): Columns loaded by COPY
+
+    Returns:
+        list of ints: Width in bytes of each column, in the same order
+    """
+    widths = {}
+    for name, width in re.findall(r"^\s*(\w+)\s+(?:var)?char(?:\((\d+)\))?", create_statement, re.MULTILINE | re.IGNORECASE):
+        widths[name.lower()] = int(width) if width else DEFAULT_VARCHAR_LENGTH
+    return [widths[column.lower()] for column in columns]
+
+
+def read_jsonpaths(path):
+    """Reads a COPY JSONPaths file into the key path of each expression
+
+    Args:
+        path (string): Local JSONPaths file, e.g. log_json_path.json
+
+    Returns:
+        list of tuples of strings: Key path for each JSONPath expression, in order
+    """
+    with open(path) as f:
+        expressions = json.load(f)["jsonpaths"]
+    return [tuple(bracket or dot for bracket, dot in re.findall(r"\['([^']*)'\]|\.(\w+)", expression)) for expression in expressions]
+
+
+def jsonpath_values(record, key_paths):
+    """Extracts the column values of a record with a JSONPaths mapping
+
+    Args:
+        record (dict): JSON record
+        key_paths (list of tuples of strings): Key path of each column
+
+    Returns:
+        list: Column values, None where the path is not found
+    """
+    values = []
+    for key_path in key_paths:
+        value = record
+        for key in key_path:
+            value = value.get(key) if isinstance(value, dict) else None
+        values.append(value)
+    return values
+
+
+def auto_ignorecase_values(record, columns):
+    """Extracts the column values of a record as COPY json 'auto ignorecase' does
+
+    Args:
+        record (dict): JSON record
+        columns (list of strings): Column names
+
+    Returns:
+        list: Column values, None where the key is not found
+    """
+    lower_record = {key.lower(): value for key, value in record.items()}
+    return [lower_record.get(column.lower()) for column in columns]
+
+
+def rendered_text(value):
+    """Text of a JSON value once loaded into a varchar column
+
+    Args:
+        value: JSON value, not None
+
+    Returns:
+        string: Loaded text
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return json.dumps(value)
+
+
+def rendered_length(value):
+    """Length in bytes of a JSON value once loaded into a varchar column
+
+    Args:
+        value: JSON value
+
+    Returns:
+        int: UTF-8 length of the loaded text
+    """
+    return len(rendered_text(value).encode("utf-8"))
+
+
+def parse_record(line, columns, widths, key_paths=None):
+    """Parses a raw JSON record into the staging table column values, validating it
+
+    Args:
+        line (string): Raw JSON record
+        columns (list of strings): Columns loaded by COPY
+        widths (list of ints): Width in bytes of each column
+        key_paths (list of tuples of strings): JSONPaths mapping, json 'auto ignorecase' when None
+
+    Returns:
+        tuple: column values, None when the record is not valid, and the reason it would fail the COPY, None when it is clean
+    """
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        return None, f"malformed json: {e}"
+    if not isinstance(record, dict):
+        return None, "not a json object"
+    values = jsonpath_values(record, key_paths) if key_paths is not None else auto_ignorecase_values(record, columns)
+    for column, width, value in zip(columns, widths, values):
+        if value is not None and rendered_length(value) > width:
+            return None, f"{column} is {rendered_length(value)} bytes, longer than varchar({width})"
+    return values, None
+
+
+def validate_record(line, columns, widths, key_paths=None):
+    """Validates a raw JSON record against the staging table
+
+    Args:
+        line (string): Raw JSON record
+        columns (list of strings): Columns loaded by COPY
+        widths (list of ints): Width in bytes of each column
+        key_paths (list of tuples of strings): JSONPaths mapping, json 'auto ignorecase' when None
+
+    Returns:
+        string: Reason the record would fail the COPY, None when it is clean
+    """
+    return parse_record(line, columns, widths, key_paths)[1]
+
+
+def decoded_lines(path):
+    """Reads a file line by line in binary, decoding each line as strict UTF-8
+    as COPY rejects invalid UTF-8 instead of replacing it
+
+    Args:
+        path (string): Local file path
+
+    Returns:
+        generator of tuples: line number, raw line bytes, decoded line or None when it is not valid UTF-8
+    """
+    with open(path, "rb") as f:
+        for line_number, raw_line in enumerate(f, 1):
+            try:
+                line = raw_line.decode("utf-8")
+            except UnicodeDecodeError:
+                line = None
+            yield line_number, raw_line, line
+
+
+def quarantine_record(quarantine_file, quarantine_path, line_number, raw_line, reason):
+    """Writes a bad record with its line number and reason, opening the quarantine file on the first one
+
+    Args:
+        quarantine_file (file): Open quarantine file, None before the first bad record
+        quarantine_path (string): Path of the quarantine file
+        line_number (int): Line number of the record in the source file
+        raw_line (bytes): Raw record
+        reason (string): Reason the record would fail the COPY
+
+    Returns:
+        file: Open quarantine file
+    """
+    if quarantine_file is None:
+        os.makedirs(os.path.dirname(quarantine_path), exist_ok=True)
+        quarantine_file = open(quarantine_path, "w", encoding="utf-8")
+    record = raw_line.decode("utf-8", errors="backslashreplace").rstrip("\n")
+    quarantine_file.write(json.dumps({"line": line_number, "reason": reason, "record": record}) + "\n")
+    return quarantine_file
+
+
+def validate_file(relative_path, source_dir, clean_dir, quarantine_dir, columns, widths, key_paths=None):
+    """Streams a source file line by line, writing clean records to clean_dir
+    and bad records, with their reason, to quarantine_dir
+
+    Args:
+        relative_path (string): File path relative to source_dir
+        source_dir (string): Local source directory
+        clean_dir (string): Directory for the clean files
+        quarantine_dir (string): Directory for the quarantined records
+        columns (list of strings): Columns loaded by COPY
+        widths (list of ints): Width in bytes of each column
+        key_paths (list of tuples of strings): JSONPaths mapping, json 'auto ignorecase' when None
+
+    Returns:
+        tuple: relative_path, clean record count, quarantined record count
+    """
+    clean_path = os.path.join(clean_dir, relative_path)
+    quarantine_path = os.path.join(quarantine_dir, relative_path)
+    os.makedirs(os.path.dirname(clean_path), exist_ok=True)
+    clean_count = 0
+    quarantine_count = 0
+    quarantine_file = None
+    try:
+        with open(clean_path, "wb") as clean_file:
+            for line_number, raw_line, line in decoded_lines(os.path.join(source_dir, relative_path)):
+                if not raw_line.strip():
+                    continue
+                reason = "invalid utf-8" if line is None else validate_record(line, columns, widths, key_paths)
+                if reason is None:
+                    # The original bytes, so the clean file is not altered
+                    clean_file.write(raw_line if raw_line.endswith(b"\n") else raw_line + b"\n")
+                    clean_count += 1
+                    continue
+                quarantine_file = quarantine_record(quarantine_file, quarantine_path, line_number, raw_line, reason)
+                quarantine_count += 1
+    finally:
+        if quarantine_file is not None:
+            quarantine_file.close()
+    if clean_count == 0:
+        os.remove(clean_path)
+    return relative_path, clean_count, quarantine_count
+
+
+def list_files(directory):
+    """Lists the json files under a directory
+
+    Args:
+        directory (string): Local source directory
+
+    Returns:
+        generator of strings: File paths relative to directory
+    """
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.endswith(".json"):
+                yield os.path.relpath(os.path.join(root, name), directory)
+
+
+def validate_source(name, source_dir, clean_dir, quarantine_dir, clean_s3_prefix, workers, columns, widths, key_paths=None):
+    """Validates every file of a source with a process pool and writes the COPY manifest of the clean files
+
+    Args:
+        name (string): Source name, e.g. log-data
+        source_dir (string): Local source directory
+        clean_dir (string): Directory for the clean files
+        quarantine_dir (string): Directory for the quarantined records
+        clean_s3_prefix (string): S3 prefix clean_dir is uploaded to
+        workers (int): Process pool size
+        columns (list of strings): Columns loaded by COPY
+        widths (list of ints): Width in bytes of each column
+        key_paths (list of tuples of strings): JSONPaths mapping, json 'auto ignorecase' when None
+
+    Returns:
+        string: Path of the manifest file
+
+    Raises:
+        ValueError: When clean_s3_prefix is not an s3:// URI, as COPY would only fail on the manifest at load time
+    """
+    if not clean_s3_prefix.startswith("s3://"):
+        raise ValueError(f"CLEAN_S3_PREFIX must be an s3:// URI, got '{clean_s3_prefix}'")
+    validate = partial(validate_file,
+        source_dir=source_dir,
+        clean_dir=os.path.join(clean_dir, name),
+        quarantine_dir=os.path.join(quarantine_dir, name),
+        columns=columns,
+        widths=widths,
+        key_paths=key_paths)
+    entries = []
+    clean_total = 0
+    quarantine_total = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for relative_path, clean_count, quarantine_count in executor.map(validate, list_files(source_dir), chunksize=16):
+            clean_total += clean_count
+            quarantine_total += quarantine_count
+            if clean_count:
+                url = "/".join([clean_s3_prefix.rstrip("/"), name, *relative_path.split(os.sep)])
+                entries.append({"url": url, "mandatory": True})
+    manifest_path = os.path.join(clean_dir, f"{name}.manifest")
+    os.makedirs(clean_dir, exist_ok=True)
+    with open(manifest_path, "w") as f:
+        json.dump({"entries": entries}, f, indent=2)
+    print(f"{name}: {clean_total} clean records in {len(entries)} files, {quarantine_total} quarantined records")
+    return manifest_path
+
+
+def main():
+    """Entry point for the pre-COPY validation of the raw log and song files
+    """
+    config = configparser.ConfigParser()
+    config.read('dwh.cfg')
+    validation = config['VALIDATION']
+    workers = validation.getint('WORKERS')
+
+    validate_source('log-data',
+        validation['LOG_DATA_DIR'], validation['CLEAN_DIR'], validation['QUARANTINE_DIR'], validation['CLEAN_S3_PREFIX'], workers,
+        sql_queries.staging_events_copy_columns,
+        column_widths(sql_queries.staging_events_table_create, sql_queries.staging_events_copy_columns),
+        read_jsonpaths(validation['LOG_JSONPATH_FILE']))
+
+    validate_source('song-data',
+        validation['SONG_DATA_DIR'], validation['CLEAN_DIR'], validation['QUARANTINE_DIR'], validation['CLEAN_S3_PREFIX'], workers,
+        sql_queries.staging_songs_copy_columns,
+        column_widths(sql_queries.staging_songs_table_create, sql_queries.staging_songs_copy_columns))
+
+
+if __name__ == "__main__":
+    main()